@@ -1,15 +1,13 @@
 import json
-import boto3
 import logging
 from datetime import datetime, timedelta
 from strands import Agent, tool
-from strands.models.openai import OpenAIModel
 from bedrock_agentcore import BedrockAgentCoreApp
+from shared.openai_factory import get_openai_model
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-AWS_REGION = 'us-east-1'
-OPENAI_SECRET_NAME = 'openai-api-key'
+OPENAI_MODEL_ID = 'gpt-4o-mini'
 
 app = BedrockAgentCoreApp()
 
@@ -44,6 +42,33 @@ MOCK_SHIPMENTS = {
     }
 }
 
+def _serialize_delayed_shipments():
+    """Build the find_delayed_shipments result from MOCK_SHIPMENTS"""
+    delayed = [
+        {
+            "reference_no": ref_no,
+            "status": shipment["status"],
+            "current_location": shipment["current_location"],
+            "event": shipment["event"],
+            "occurred_at": shipment["occurred_at"],
+            "details": shipment["details"]
+        }
+        for ref_no, shipment in MOCK_SHIPMENTS.items()
+        if shipment.get("status") == "AT_RISK"
+    ]
+    
+    if not delayed:
+        return "No delayed shipments found"
+    
+    return json.dumps(delayed, separators=(",", ":"))
+
+# The mock data is fixed at import, so tool results are serialized once here
+_SHIPMENT_STATUS_JSON = {
+    ref_no: json.dumps(shipment, separators=(",", ":"))
+    for ref_no, shipment in MOCK_SHIPMENTS.items()
+}
+_DELAYED_SHIPMENTS_RESULT = _serialize_delayed_shipments()
+
 @tool
 def get_shipment_status(reference_no: str) -> str:
     """
@@ -55,15 +80,10 @@ def get_shipment_status(reference_no: str) -> str:
     Returns:
         Current status, location, and latest event details
     """
-    try:
-        if reference_no in MOCK_SHIPMENTS:
-            return json.dumps(MOCK_SHIPMENTS[reference_no], indent=2)
-        else:
-            return f"Shipment {reference_no} not found"
-            
-    except Exception as e:
-        logger.error(f"Error in get_shipment_status: {type(e).__name__}: {str(e)}", exc_info=True)
-        return f"Error retrieving shipment status: {str(e)}"
+    if reference_no in _SHIPMENT_STATUS_JSON:
+        return _SHIPMENT_STATUS_JSON[reference_no]
+    else:
+        return f"Shipment {reference_no} not found"
 
 
 @tool
@@ -74,62 +94,7 @@ def find_delayed_shipments() -> str:
     Returns:
         List of shipments with at-risk status
     """
-    try:
-        # Filter shipments from MOCK_SHIPMENTS that have AT_RISK status
-        delayed = []
-        for ref_no, shipment in MOCK_SHIPMENTS.items():
-            if shipment.get("status") == "AT_RISK":
-                delayed.append({
-                    "reference_no": ref_no,
-                    "status": shipment["status"],
-                    "current_location": shipment["current_location"],
-                    "event": shipment["event"],
-                    "occurred_at": shipment["occurred_at"],
-                    "details": shipment["details"]
-                })
-        
-        if not delayed:
-            return "No delayed shipments found"
-        
-        return json.dumps(delayed, indent=2)
-            
-    except Exception as e:
-        logger.error(f"Error in find_delayed_shipments: {type(e).__name__}: {str(e)}", exc_info=True)
-        return f"Error finding delayed shipments: {str(e)}"
-
-_openai_model = None
-
-def _get_openai_model():
-    """Get OpenAI model with API key from Secrets Manager"""
-    global _openai_model
-    
-    if _openai_model is not None:
-        return _openai_model
-    
-    try:
-        # Get OpenAI API key from Secrets Manager
-        secrets_client = boto3.client('secretsmanager', region_name=AWS_REGION)
-        secret_response = secrets_client.get_secret_value(SecretId=OPENAI_SECRET_NAME)
-
-        secret_data = json.loads(secret_response['SecretString'])
-        api_key = secret_data.get('openai-api-key', 'Not found')
-        
-        # Create OpenAI model
-        _openai_model = OpenAIModel(
-            client_args={"api_key": api_key},
-            model_id="gpt-4o-mini",
-            params={
-                "max_tokens": 2000,
-                "temperature": 0.7,
-            }
-        )
-        logger.info("OpenAI model initialized successfully")
-        return _openai_model
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI model: {e}", exc_info=True)
-        raise
-
+    return _DELAYED_SHIPMENTS_RESULT
 
 SYSTEM_PROMPT = """You are a logistics tracking assistant with access to a shipment tracking system.
 
@@ -154,7 +119,7 @@ def _initialize_agent():
     global _agent
     if _agent is None:
         # Get OpenAI model
-        openai_model = _get_openai_model()
+        openai_model = get_openai_model(OPENAI_MODEL_ID)
         
         # Create agent with OpenAI model
         _agent = Agent(
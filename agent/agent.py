@@ -1,10 +1,18 @@
+import os
+import re
 import json
-import boto3
+import asyncio
+import time
+import queue
+import hashlib
 import logging
-import pg8000.native
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from strands import Agent, tool
-from strands.models.openai import OpenAIModel
 from bedrock_agentcore import BedrockAgentCoreApp
+from shared.openai_factory import get_openai_model
+from shared.secret_cache import get_secret
 
 
 # Configure logging
@@ -12,76 +20,122 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
-AWS_REGION = 'us-east-1'
-OPENAI_SECRET_NAME = 'openai-api-key'  
+OPENAI_MODEL_ID = 'gpt-4o'
 
 app = BedrockAgentCoreApp()
 
 # Database configuration - cached after first load within a session
 _db_config = None
-_db_credentials = None
-_db_connection = None
+
+# Pool of idle database connections shared by concurrent tool calls
+DB_POOL_SIZE = 5
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
 
 def _load_db_config():
-    """Load database configuration from SSM Parameter Store"""
-    global _db_config, _db_credentials
-    
-    if _db_config is not None:
-        return _db_config, _db_credentials
+    """Load database configuration from the runtime environment"""
+    global _db_config
     
     try:
-        # Load configuration from SSM Parameter Store
-        ssm_client = boto3.client('ssm', region_name=AWS_REGION)
-        response = ssm_client.get_parameters(
-            Names=[
-                '/agentcore/rds/endpoint',
-                '/agentcore/rds/database',
-                '/agentcore/rds/secret-arn'
-            ]
-        )
-        
-        params = {p['Name']: p['Value'] for p in response['Parameters']}
-        _db_config = {
-            'endpoint': params['/agentcore/rds/endpoint'],
-            'database': params['/agentcore/rds/database'],
-            'secret_arn': params['/agentcore/rds/secret-arn']
-        }
+        if _db_config is None:
+            # Set on the runtime by the CDK stack at deploy time
+            _db_config = {
+                'endpoint': os.environ['RDS_ENDPOINT'],
+                'database': os.environ['RDS_DATABASE'],
+                'secret_arn': os.environ['RDS_SECRET_ARN']
+            }
         
         # Load credentials from Secrets Manager
-        secrets_client = boto3.client('secretsmanager', region_name=AWS_REGION)
-        secret_response = secrets_client.get_secret_value(SecretId=_db_config['secret_arn'])
-        _db_credentials = json.loads(secret_response['SecretString'])
-        
-        return _db_config, _db_credentials
+        return _db_config, get_secret(_db_config['secret_arn'])
         
     except Exception as e:
         logger.error(f"Failed to load database configuration: {e}", exc_info=True) 
         raise
 
 def get_db_connection():
-    """Get or create a cached database connection"""    
-    global _db_connection
-    
-    # Check if we have a cached connection and if it's still alive
-    if _db_connection is not None:
-            return _db_connection
+    """Open a new database connection using the cached configuration"""
+    import psycopg
     
-    # Create new connection
     try:
         config, credentials = _load_db_config()
         
-        _db_connection = pg8000.native.Connection(
+        return psycopg.Connection.connect(
             host=config['endpoint'],
-            database=config['database'],
+            dbname=config['database'],
             user=credentials['username'],
             password=credentials['password'],
-            timeout=30  
+            connect_timeout=30,
+            # Read-only tools; don't leave idle transactions open between calls
+            autocommit=True,
+            # Prepare every query server-side on first use, per connection
+            prepare_threshold=0,
         )
-        return _db_connection
     except Exception as e:
         logger.error(f"Database connection failed: {type(e).__name__}: {str(e)}")  # noqa: TRY400
         raise
 
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+def _return_connection(conn):
+    try:
+        _db_pool.put_nowait(conn)
+    except queue.Full:
+        _close_quietly(conn)
+
+@contextmanager
+def _checkout():
+    """Borrow a validated connection from the pool and return it when done"""
+    import psycopg
+    
+    try:
+        conn = _db_pool.get_nowait()
+    except queue.Empty:
+        conn = get_db_connection()
+    else:
+        # Recycle idle connections the server or network has dropped
+        try:
+            conn.execute("SELECT 1")
+        except psycopg.OperationalError:
+            _close_quietly(conn)
+            conn = get_db_connection()
+    
+    try:
+        yield conn
+    finally:
+        # Broken connections are never handed to another caller
+        if conn.broken or conn.closed:
+            _close_quietly(conn)
+        else:
+            _return_connection(conn)
+
+# Shared by the single and batch shipment status tools
+_SHIPMENT_STATUS_SELECT = """
+        SELECT 
+            s.reference_no,
+            -- Enums are cast to text: psycopg has no binary loader for
+            -- custom enum types and would return them as bytes
+            s.status::text AS status,
+            le.event::text AS event,
+            loc.name AS current_location,
+            loc.unlocode,
+            le.occurred_at,
+            le.details
+        FROM logistics.shipments s
+        -- Same row as v_shipment_latest_event, but resolved per shipment
+        -- with one descent of idx_tracking_events_shipment
+        JOIN LATERAL (
+            SELECT te.event, te.location_id, te.occurred_at, te.details
+            FROM logistics.tracking_events te
+            WHERE te.shipment_id = s.shipment_id
+            ORDER BY te.occurred_at DESC
+            LIMIT 1
+        ) le ON TRUE
+        LEFT JOIN logistics.locations loc ON loc.location_id = le.location_id
+"""
+
 @tool
 def get_shipment_status(reference_no: str) -> str:
     """
@@ -94,27 +148,15 @@ def get_shipment_status(reference_no: str) -> str:
         Current status, location, and latest event details
     """
     try:
-        conn = get_db_connection()
-        
-        query = """
-        SELECT 
-            s.reference_no,
-            s.status,
-            le.event,
-            loc.name AS current_location,
-            loc.unlocode,
-            le.occurred_at,
-            le.details
-        FROM logistics.shipments s
-        JOIN logistics.v_shipment_latest_event le ON le.shipment_id = s.shipment_id
-        LEFT JOIN logistics.locations loc ON loc.location_id = le.location_id
-        WHERE s.reference_no = :reference_no
+        query = _SHIPMENT_STATUS_SELECT + """
+        WHERE s.reference_no = %(reference_no)s
         """
         
-        result = conn.run(query, reference_no=reference_no)
+        with _checkout() as conn:
+            result = conn.execute(query, {'reference_no': reference_no}, binary=True).fetchall()
         
         if result:
-            return json.dumps(result[0], default=str, indent=2)
+            return json.dumps(result[0], default=str, separators=(",", ":"))
         else:
             return f"Shipment {reference_no} not found"
             
@@ -122,6 +164,38 @@ def get_shipment_status(reference_no: str) -> str:
         logger.error(f"Error in get_shipment_status: {type(e).__name__}: {str(e)}", exc_info=True)
         return f"Error retrieving shipment status: {str(e)}"
 
+@tool
+def get_shipments_status(reference_nos: list[str]) -> str:
+    """
+    Get the current status and latest event for several shipments at once.
+    
+    Args:
+        reference_nos: Shipment reference numbers (e.g., ['CUST-REF-1001', 'GLBL-REF-2001'])
+    
+    Returns:
+        Current status, location, and latest event details for each shipment found
+    """
+    try:
+        query = _SHIPMENT_STATUS_SELECT + """
+        WHERE s.reference_no = ANY(%(reference_nos)s)
+        ORDER BY s.reference_no
+        """
+        
+        with _checkout() as conn:
+            results = conn.execute(query, {'reference_nos': list(reference_nos)}, binary=True).fetchall()
+        
+        found = {row[0] for row in results}
+        missing = [ref for ref in reference_nos if ref not in found]
+        
+        response = json.dumps(results, default=str, separators=(",", ":")) if results else "No shipments found"
+        if missing:
+            response += f"\nShipments not found: {', '.join(missing)}"
+        return response
+            
+    except Exception as e:
+        logger.error(f"Error in get_shipments_status: {type(e).__name__}: {str(e)}", exc_info=True)
+        return f"Error retrieving shipment statuses: {str(e)}"
+
 @tool
 def find_delayed_shipments() -> str:
     """
@@ -131,8 +205,6 @@ def find_delayed_shipments() -> str:
         List of shipments with at-risk status
     """
     try:
-        conn = get_db_connection()
-        
         query = """
         SELECT 
             r.reference_no,
@@ -144,10 +216,11 @@ def find_delayed_shipments() -> str:
         ORDER BY r.eta DESC NULLS LAST
         """
         
-        results = conn.run(query)
+        with _checkout() as conn:
+            results = conn.execute(query, binary=True).fetchall()
         
         if results:
-            return json.dumps(results, default=str, indent=2)
+            return json.dumps(results, default=str, separators=(",", ":"))
         else:
             return "No delayed shipments found"
             
@@ -155,6 +228,11 @@ def find_delayed_shipments() -> str:
         logger.error(f"Error in find_delayed_shipments: {type(e).__name__}: {str(e)}", exc_info=True)
         return f"Error finding delayed shipments: {str(e)}"
 
+# Kept static and byte-identical across calls so that it forms a stable
+# prefix for OpenAI's automatic prompt caching, which only applies to
+# prompts of 1024 tokens or more. The reference data below keeps this prompt
+# alone (about 1,300 tokens) above that threshold; anything that varies per
+# request belongs in the user message, never here.
 SYSTEM_PROMPT = """You are a logistics tracking assistant with access to a real-time shipment database.
 
 You can help users:
@@ -168,82 +246,333 @@ When answering questions:
 - Be concise and focus on the most relevant information
 - Include reference numbers, locations, and timestamps
 - Explain any issues or delays clearly
-- Suggest next steps when appropriate"""
+- Suggest next steps when appropriate
+
+## Reference data
+
+Shipment reference numbers have the form <ACCOUNT>-REF-<NUMBER>, where
+<ACCOUNT> is the customer's account prefix, e.g. CUST-REF-1001,
+GLBL-REF-2001 or FASH-REF-3001. Always pass them to tools in upper case
+exactly as written. When a question involves more than one reference
+number, look them all up with a single get_shipments_status call instead
+of calling get_shipment_status once per shipment.
+
+Tool results are rows of values in a fixed column order:
+- get_shipment_status: reference_no, status, event, current_location,
+  unlocode, occurred_at, details
+- get_shipments_status: one row per shipment, same columns as
+  get_shipment_status
+- find_delayed_shipments: one row per shipment with reference_no, eta,
+  eta_final, eta_status
+
+Column meanings:
+- reference_no: the customer's tracking reference for the shipment
+- status: overall shipment status (see "Shipment status values")
+- event: type of the most recent tracking event for the shipment
+- current_location: name of the location where that event happened;
+  null when the event has no location
+- unlocode: UN/LOCODE of that location (see "Locations")
+- occurred_at: when the event happened, as an ISO 8601 timestamp
+- details: JSON object attached to the event by the carrier, a sensor or
+  an EDI message. Common keys are note (free text summary), vessel (vessel
+  name), booking_ref, reason (why a hold or delay happened) and signed_by
+  (who accepted a delivery). Any key may be missing.
+- eta: estimated arrival of the latest leg at its destination
+- eta_final: the arrival time promised to the customer
+- eta_status: ETA risk (see "ETA risk values")
+
+Example get_shipment_status result (illustrative only, not live data):
+["GLBL-REF-2001","CUSTOMS_HOLD","CUSTOMS_HOLD","New York","USNYC",
+"2025-01-14 09:30:00+00:00",{"note":"Held for inspection","reason":"Random inspection"}]
+A good answer to "Where is GLBL-REF-2001?" based on that row: GLBL-REF-2001
+is in New York (USNYC) and has been on customs hold since 14 Jan 09:30 UTC
+(04:30 local) for a random inspection; the consignee should make sure the
+customs documentation is complete.
+
+Example find_delayed_shipments result (illustrative only, not live data):
+[["CUST-REF-1001","2025-01-24 08:00:00+00:00","2025-01-22 08:00:00+00:00","AT_RISK"]]
+This means CUST-REF-1001 is now expected two days after the promised date.
+If the result is "No delayed shipments found", say that no shipments are
+currently at risk rather than that there was an error.
+
+If a tool returns text starting with "Error", the lookup failed. Say that
+the information is temporarily unavailable and suggest trying again; do not
+guess a status. If a tool reports a shipment as not found, ask the user to
+check the reference number.
+
+Shipment status values:
+- CREATED, BOOKED: shipment registered, not yet moving
+- IN_TRANSIT: on a vessel, train, truck or aircraft
+- AT_PORT: arrived at a port and awaiting the next leg
+- CUSTOMS_HOLD: held by customs; explain that documents or inspection are pending
+- CUSTOMS_CLEARED: released by customs
+- OUT_FOR_DELIVERY, DELIVERED: final mile and completed
+- CANCELLED, EXCEPTION: needs attention; recommend contacting operations
+
+Tracking event types: CREATED, BOOKED, DEPARTED_PORT, ARRIVED_PORT,
+DISCHARGED, GATE_IN, GATE_OUT, CUSTOMS_HOLD, CUSTOMS_RELEASE, HANDOFF,
+OUT_FOR_DELIVERY, DELIVERED, DELAY, ETA_UPDATE, EXCEPTION_NOTE.
+
+ETA risk values: AT_RISK means the latest leg ETA is later than the
+promised final ETA, ON_TRACK means it is not, UNKNOWN means no leg ETA
+has been reported yet.
+
+Shipment leg status values: PENDING (not started), DEPARTED, ARRIVED,
+DELAYED, CANCELLED. Legs have a mode of OCEAN, RAIL, TRUCK or AIR.
+
+Customs clearance status values: SUBMITTED (declaration filed, awaiting a
+decision), HOLD (held for inspection or missing documents), RELEASED.
+
+Exceptions have a severity of LOW, MEDIUM or HIGH and a category of DELAY,
+DAMAGE, DOCUMENTS, CUSTOMS or WEATHER. Treat HIGH severity exceptions as
+urgent.
+
+Container types: DRY, REEFER (refrigerated, with a temperature setpoint in
+degrees Celsius), OPEN_TOP, TANK. Container numbers are four letters
+followed by seven digits, e.g. MSKU1234567; the first three letters
+identify the owner.
+
+Carriers (name - SCAC code): Maersk - MAEU, MSC - MSCU, CMA CGM - CMDU,
+Hapag-Lloyd - HLCU, ONE - ONEY.
+
+Customers (name - account prefix used in reference numbers):
+Customer Retail - CUST, Global Electronics - GLBL, Fashion Forward - FASH,
+Auto Parts Inc - AUTO.
+
+Locations (UN/LOCODE - name, country, timezone):
+- USNYC - New York, US, America/New_York
+- USLAX - Los Angeles, US, America/Los_Angeles
+- USLGB - Long Beach, US, America/Los_Angeles
+- USSAV - Savannah, US, America/New_York
+- NLRTM - Rotterdam, NL, Europe/Amsterdam
+- CNSHA - Shanghai, CN, Asia/Shanghai
+- SGSIN - Singapore, SG, Asia/Singapore
+- DEHAM - Hamburg, DE, Europe/Berlin
+
+Timestamps from the database are in UTC. When the location's timezone is
+known, mention the local time as well."""
 
 _agent = None
+_agent_lock = threading.Lock()
 
-_openai_model = None
-def _get_openai_model():
-    global _openai_model
-    
-    if _openai_model is not None:
-        return _openai_model
-    
-    try:
-        # Get OpenAI API key from Secrets Manager
-        secrets_client = boto3.client('secretsmanager', region_name=AWS_REGION)
-        secret_response = secrets_client.get_secret_value(SecretId=OPENAI_SECRET_NAME)
-
-        secret_data = json.loads(secret_response['SecretString'])
-        api_key = secret_data.get('openai-api-key', 'Not found')
-        
-        # Create OpenAI model
-        _openai_model = OpenAIModel(
-            client_args={"api_key": api_key},
-            model_id="gpt-4o",
-            params={
-                "max_tokens": 2000,
-                "temperature": 0.7,
-            }
-        )
-        logger.info("OpenAI model initialized successfully")
-        return _openai_model
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI model: {e}", exc_info=True)  
-        raise
- 
 def _initialize_agent():
     """Initialize the agent with database tools."""
     global _agent
-    if _agent is None:
-        # Get OpenAI model
-        openai_model = _get_openai_model()
-        
-        # Tools are passed directly as Python functions
-        _agent = Agent(
-            name="logistics_agent",
-            model=openai_model,
-            tools=[
-                get_shipment_status,
-                find_delayed_shipments
-            ],
-            system_prompt=SYSTEM_PROMPT,
-            callback_handler=None,
-        )
+    if _agent is not None:
+        return _agent
+    
+    with _agent_lock:
+        # Concurrent first requests must not each build their own agent
+        if _agent is None:
+            # Get OpenAI model
+            openai_model = get_openai_model(OPENAI_MODEL_ID)
+            
+            # Preload DB settings so pool checkouts never wait on AWS APIs
+            _load_db_config()
+            
+            # Tools are passed directly as Python functions
+            _agent = Agent(
+                name="logistics_agent",
+                model=openai_model,
+                tools=[
+                    get_shipment_status,
+                    get_shipments_status,
+                    find_delayed_shipments
+                ],
+                system_prompt=SYSTEM_PROMPT,
+                callback_handler=None,
+            )
     return _agent
 
+def _pre_warm():
+    """Build the agent ahead of the first request"""
+    try:
+        _initialize_agent()
+        logger.info("Agent pre-warmed")
+    except Exception as e:
+        logger.warning(f"Agent pre-warm failed, will retry on first request: {e}")
+
+# Exact-match cache for first-turn answers, which cannot depend on earlier
+# turns. Status shortcut answers keep for five minutes; delay answers from
+# the full agent track a risk view that moves faster, so they keep for one.
+RESPONSE_CACHE_TTL_SECONDS = 300
+DELAY_RESPONSE_CACHE_TTL_SECONDS = 60
+RESPONSE_CACHE_MAX_ENTRIES = 500
+
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def _response_cache_key(user_query):
+    return hashlib.sha256(user_query.strip().lower().encode()).hexdigest()
+
+def _emit_cache_metric(hit):
+    """Write a CloudWatch embedded metric format record for the cache hit rate"""
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": "LogisticsAgent",
+                "Dimensions": [[]],
+                "Metrics": [{"Name": "ResponseCacheHit", "Unit": "Count"}],
+            }],
+        },
+        "ResponseCacheHit": 1 if hit else 0,
+    }), flush=True)
+
+def _get_cached_response(user_query):
+    key = _response_cache_key(user_query)
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is not None and entry[1] <= time.time():
+            del _response_cache[key]
+            entry = None
+    _emit_cache_metric(entry is not None)
+    return entry[0] if entry is not None else None
+
+def _cache_response(user_query, response, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+    expires_at = time.time() + ttl_seconds
+    with _response_cache_lock:
+        _response_cache[_response_cache_key(user_query)] = (response, expires_at)
+        while len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+            _response_cache.popitem(last=False)
+
+# Questions about known shipments always plan to a single status lookup,
+# so that plan is run without asking the model. Delay, arrival and on-time
+# questions need ETA data the status lookup does not return, so they go
+# through the full agent.
+_DELAY_QUERY_PATTERN = re.compile(r"\bdelay|\blate\b|\bat[ -]risk\b|\beta\b", re.IGNORECASE)
+_ETA_QUERY_PATTERN = re.compile(r"\barriv|\bon[ -]time\b|\boverdue\b|\bwhen\b|\bexpected\b", re.IGNORECASE)
+_REFERENCE_NO_PATTERN = re.compile(r"\b[A-Z]{2,}-REF-\d+\b", re.IGNORECASE)
+
+def _match_shipment_status_plan(user_query):
+    """Return the reference numbers if the query only needs a status lookup"""
+    if _DELAY_QUERY_PATTERN.search(user_query) or _ETA_QUERY_PATTERN.search(user_query):
+        return None
+    
+    reference_nos = {ref.upper() for ref in _REFERENCE_NO_PATTERN.findall(user_query)}
+    if not reference_nos:
+        return None
+    return sorted(reference_nos)
+
+async def _lookup_shipment_status(reference_nos):
+    """Run the status lookup the model would have planned"""
+    if len(reference_nos) == 1:
+        shipment_status = await asyncio.to_thread(get_shipment_status, reference_nos[0])
+        return "get_shipment_status", shipment_status
+    shipment_status = await asyncio.to_thread(get_shipments_status, reference_nos)
+    return "get_shipments_status", shipment_status
+
+def _remember_turn(agent, user_text, response):
+    """Record a turn answered outside the agent so follow-ups can refer to it"""
+    agent.messages.extend([
+        {"role": "user", "content": [{"text": user_text}]},
+        {"role": "assistant", "content": [{"text": response}]},
+    ])
+
+def _has_tool_error(messages):
+    """Whether any tool result in these messages reports a failure"""
+    for message in messages:
+        for block in message.get("content", []):
+            tool_result = block.get("toolResult")
+            if tool_result is None:
+                continue
+            if tool_result.get("status") == "error":
+                return True
+            if any(item.get("text", "").startswith("Error ") for item in tool_result.get("content", [])):
+                return True
+    return False
+
+def _shipment_summary_prompt(user_query, reference_nos, tool_name, shipment_status):
+    return (
+        f"{user_query}\n\n"
+        f"Result of {tool_name} for {', '.join(reference_nos)}:\n{shipment_status}"
+    )
+
+async def _stream_shipment_summary(prompt):
+    """Stream a single model call phrasing the answer from the lookup result"""
+    openai_model = await asyncio.to_thread(get_openai_model, OPENAI_MODEL_ID)
+    
+    # Tool-less, so the model can only phrase the lookup it is given
+    summarizer = Agent(
+        name="logistics_summarizer",
+        model=openai_model,
+        system_prompt=SYSTEM_PROMPT,
+        callback_handler=None,
+    )
+    async for event in summarizer.stream_async(prompt):
+        yield event
+
 @app.entrypoint
-def logistics_query(payload):
-    """Handle logistics queries"""
+async def logistics_query(payload):
+    """Handle logistics queries, streaming text back as it is generated"""
     
     user_query = payload.get("query")
     
     if not user_query:
-        return "Please provide a query in the format: {\"query\": \"your question here\"}"
+        yield "Please provide a query in the format: {\"query\": \"your question here\"}"
+        return
     
     try:
         # Initialize agent lazily on first request
-        agent = _initialize_agent()
+        agent = await asyncio.to_thread(_initialize_agent)
         
-        # Execute the agent
-        result = agent(user_query)
+        # Only a first turn can skip the agent; later turns may refer back
+        # to earlier ones ("compare it with ...") and need the history
+        first_turn = not agent.messages
+        reference_nos = _match_shipment_status_plan(user_query) if first_turn else None
+        if reference_nos is None:
+            cache_answer = first_turn and _DELAY_QUERY_PATTERN.search(user_query) is not None
+            if cache_answer:
+                cached = _get_cached_response(user_query)
+                if cached is not None:
+                    _remember_turn(agent, user_query, cached)
+                    yield cached
+                    return
+            
+            # Forward text deltas only; tool and lifecycle events stay server side
+            turn_start = len(agent.messages)
+            chunks = []
+            async for event in agent.stream_async(user_query):
+                if "data" in event:
+                    chunks.append(event["data"])
+                    yield event["data"]
+            
+            response = "".join(chunks)
+            if cache_answer and response.strip() and not _has_tool_error(agent.messages[turn_start:]):
+                _cache_response(user_query, response, DELAY_RESPONSE_CACHE_TTL_SECONDS)
+            return
+        
+        # Serve repeated questions without another model round trip
+        cached = _get_cached_response(user_query)
+        if cached is not None:
+            _remember_turn(agent, user_query, cached)
+            yield cached
+            return
+        
+        tool_name, shipment_status = await _lookup_shipment_status(reference_nos)
+        prompt = _shipment_summary_prompt(user_query, reference_nos, tool_name, shipment_status)
         
-        # Return the response
-        return result.message['content'][0]['text']
+        chunks = []
+        async for event in _stream_shipment_summary(prompt):
+            if "data" in event:
+                chunks.append(event["data"])
+                yield event["data"]
+        
+        # Keep the lookup in the recorded turn so the agent can build on it
+        response = "".join(chunks)
+        _remember_turn(agent, prompt, response)
+        
+        # Never replay an empty answer or one built on a failed lookup
+        if response.strip() and not shipment_status.startswith("Error "):
+            _cache_response(user_query, response)
     except Exception as e:
         logger.error(f"Query failed: {type(e).__name__}: {str(e)}", exc_info=True)
-        return f"Query failed: {str(e)}"
+        yield f"Query failed: {str(e)}"
+
+# Runs in the background so startup is not delayed; requests arriving
+# before it finishes wait on _agent_lock instead of building a second agent
+if os.environ.get("PRE_WARM"):
+    threading.Thread(target=_pre_warm, name="agent-pre-warm", daemon=True).start()
 
 if __name__ == "__main__":
     app.run()
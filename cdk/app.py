@@ -20,8 +20,14 @@ subnet_1 = os.environ.get("AGENTCORE_SUBNET_1")
 subnet_2 = os.environ.get("AGENTCORE_SUBNET_2")
 runtime_sg_id = os.environ.get("AGENTCORE_RUNTIME_SG_ID")
 db_secret_arn = os.environ.get("AGENTCORE_DB_SECRET_ARN")
+db_endpoint = os.environ.get("AGENTCORE_DB_ENDPOINT")
+db_name = os.environ.get("AGENTCORE_DB_NAME")
 openai_secret_arn = os.environ.get("AGENTCORE_OPENAI_SECRET_ARN")
 
+# Agent to package: "agent" (RDS-backed tools, default) or
+# "agent-mocked-tools", selected with `cdk deploy -c agent_dir=...`
+agent_dir = app.node.try_get_context("agent_dir") or "agent"
+
 # Validate required environment variables
 required_vars = {
     "AGENTCORE_VPC_ID": vpc_id,
@@ -29,6 +35,8 @@ required_vars = {
     "AGENTCORE_SUBNET_2": subnet_2,
     "AGENTCORE_RUNTIME_SG_ID": runtime_sg_id,
     "AGENTCORE_DB_SECRET_ARN": db_secret_arn,
+    "AGENTCORE_DB_ENDPOINT": db_endpoint,
+    "AGENTCORE_DB_NAME": db_name,
     "AGENTCORE_OPENAI_SECRET_ARN": openai_secret_arn,
 }
 
@@ -46,7 +54,10 @@ LogisticsAgentRuntimeStack(
     private_subnet_ids=[subnet_1, subnet_2],
     runtime_security_group_id=runtime_sg_id,
     db_secret_arn=db_secret_arn,
+    db_endpoint=db_endpoint,
+    db_name=db_name,
     openai_secret_arn=openai_secret_arn,
+    agent_dir=agent_dir,
     env=cdk.Environment(
         account=account,
         region=region,
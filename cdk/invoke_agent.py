@@ -2,28 +2,139 @@ import boto3
 import json
 import uuid
 import os
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 
-# Initialize the client
-client = boto3.client('bedrock-agentcore', region_name='us-east-1')
+# Initialize the client once so repeated invocations reuse its credentials
+# and pooled TCP/TLS connections
+client = boto3.Session().client(
+    'bedrock-agentcore',
+    region_name='us-east-1',
+    config=Config(max_pool_connections=50, retries={'mode': 'adaptive'}),
+)
 
 # Get runtime ARN from environment variable (set in previous step)
 runtime_arn = os.environ.get('AGENT_RUNTIME_ARN') or f"arn:aws:bedrock-agentcore:us-east-1:{os.environ.get('CDK_DEFAULT_ACCOUNT')}:runtime/RUNTIME_ID"
 
-# Create a unique session ID for each invocation (33+ characters required)
-session_id = str(uuid.uuid4()) + '-demo-session'
+DEFAULT_QUERY = "What shipments are at risk of being delayed?"
 
-# Prepare the payload
-payload = json.dumps({"query": "What shipments are at risk of being delayed?"})
 
-# Invoke the agent
-response = client.invoke_agent_runtime(
-    agentRuntimeArn=runtime_arn,
-    runtimeSessionId=session_id,
-    payload=payload,
-    qualifier="DEFAULT"  # Optional
-)
+def new_session_id():
+    """Create a unique session ID (33+ characters required)"""
+    return str(uuid.uuid4()) + '-demo-session'
+
+
+def invoke(client, query, on_chunk=None, session_id=None):
+    """Invoke the agent and return the full response text
+
+    Without a session_id each invocation starts a new session.
+    """
+    if session_id is None:
+        session_id = new_session_id()
+
+    # Prepare the payload
+    payload = json.dumps({"query": query})
+
+    # Invoke the agent
+    response = client.invoke_agent_runtime(
+        agentRuntimeArn=runtime_arn,
+        runtimeSessionId=session_id,
+        payload=payload,
+        qualifier="DEFAULT"  # Optional
+    )
+
+    if "text/event-stream" not in response.get("contentType", ""):
+        response_body = response['response'].read()
+        response_text = json.dumps(json.loads(response_body), indent=2)
+        if on_chunk is not None:
+            on_chunk(response_text)
+        return response_text
+
+    # Each server-sent event carries one JSON-encoded text chunk. Read byte by
+    # byte only when printing live; otherwise larger reads keep client CPU
+    # out of the measured latency
+    chunks = []
+    read_size = 1 if on_chunk is not None else 4096
+    for line in response['response'].iter_lines(chunk_size=read_size):
+        if line.startswith(b"data: "):
+            chunk = json.loads(line[len(b"data: "):])
+            chunks.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    return "".join(chunks)
+
+
+# One session per benchmark worker thread when sessions are reused
+_worker_sessions = threading.local()
+
+
+def _timed_invoke(query, reuse_sessions):
+    """Return (latency, None) on success or (None, error) on failure"""
+    session_id = None
+    if reuse_sessions:
+        if not hasattr(_worker_sessions, 'session_id'):
+            _worker_sessions.session_id = new_session_id()
+        session_id = _worker_sessions.session_id
+    start = time.perf_counter()
+    try:
+        invoke(client, query, session_id=session_id)
+    except Exception as e:
+        return None, e
+    return time.perf_counter() - start, None
+
+
+def benchmark(query, requests, workers, reuse_sessions=False):
+    """Send requests concurrently over the shared client and report latency
+
+    By default every request starts a new runtime session, so this measures
+    cold sessions. With reuse_sessions each worker keeps one session, so
+    after its first request the warm paths (connection pool, secret cache,
+    pre-warmed agent) are measured instead.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda q: _timed_invoke(q, reuse_sessions), [query] * requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results if latency is not None)
+    errors = Counter(type(error).__name__ for _, error in results if error is not None)
+
+    session_mode = "one session per worker" if reuse_sessions else "a new session per request"
+    print(f"Requests: {requests} with {workers} workers ({session_mode}) in {elapsed:.2f}s")
+    print(f"Succeeded: {len(latencies)}, failed: {sum(errors.values())}")
+    for error_name, count in errors.most_common():
+        print(f"  {error_name}: {count}")
+
+    if latencies:
+        print(f"Latency p50: {latencies[len(latencies) // 2]:.2f}s")
+        print(f"Latency p95: {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f}s")
+        print(f"Latency max: {latencies[-1]:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoke the logistics agent runtime")
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="Question to send to the agent")
+    parser.add_argument("--requests", type=int, default=1,
+                        help="Number of invocations; more than 1 runs a benchmark, "
+                             "which starts a new (cold) session per request unless --reuse-sessions is set")
+    parser.add_argument("--workers", type=int, default=20, help="Concurrent invocations when benchmarking")
+    parser.add_argument("--reuse-sessions", action="store_true",
+                        help="Keep one session per benchmark worker to measure warm sessions")
+    args = parser.parse_args()
+
+    if args.requests > 1:
+        benchmark(args.query, args.requests, args.workers, args.reuse_sessions)
+        return
+
+    # Print the response as it streams in
+    print("Agent Response: ", end="", flush=True)
+    invoke(client, args.query, on_chunk=lambda chunk: print(chunk, end="", flush=True))
+    print()
+
 
-# Parse and print the response
-response_body = response['response'].read()
-response_data = json.loads(response_body)
-print("Agent Response:", json.dumps(response_data, indent=2))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ from aws_cdk import (
     aws_ec2 as ec2,
     BundlingOptions,
     DockerImage,
+    DockerVolume,
+    FileSystem,
     CfnResource,
     CfnOutput,
 )
@@ -24,7 +26,10 @@ class LogisticsAgentRuntimeStack(Stack):
         private_subnet_ids: Sequence[str],
         runtime_security_group_id: str,
         db_secret_arn: str,
+        db_endpoint: str,
+        db_name: str,
         openai_secret_arn: str,
+        agent_dir: str = "agent",
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -50,7 +55,7 @@ class LogisticsAgentRuntimeStack(Stack):
         #
 
         # Calculate paths
-        agent_dir_path = os.path.join(os.path.dirname(__file__), "..", "agent")
+        agent_dir_path = os.path.join(os.path.dirname(__file__), "..", agent_dir)
         agent_dir_path = os.path.abspath(agent_dir_path)
 
         if not os.path.exists(agent_dir_path):
@@ -59,6 +64,16 @@ class LogisticsAgentRuntimeStack(Stack):
                 "Please ensure the agent directory exists with your agent code."
             )
 
+        # Helpers shared with the mocked agent, copied into the bundle root
+        shared_dir_path = os.path.join(os.path.dirname(__file__), "..", "shared")
+        shared_dir_path = os.path.abspath(shared_dir_path)
+
+        if not os.path.exists(shared_dir_path):
+            raise FileNotFoundError(
+                f"Shared directory not found: {shared_dir_path}. "
+                "Please ensure the shared directory exists alongside the agent directory."
+            )
+
         scripts_dir_path = os.path.join(os.path.dirname(__file__), "scripts")
         scripts_dir_path = os.path.abspath(scripts_dir_path)
 
@@ -72,37 +87,78 @@ class LogisticsAgentRuntimeStack(Stack):
         with open(create_zip_script_path, "r", encoding="utf-8") as f:
             create_zip_script = f.read()
 
+        # Host directories mounted as the pip and uv caches so downloaded
+        # wheels are reused across deploys instead of fetched every bundle
+        bundle_cache_path = os.path.join(os.path.dirname(__file__), ".bundle-cache")
+        bundle_cache_path = os.path.abspath(bundle_cache_path)
+        for cache_name in ("pip", "uv"):
+            os.makedirs(os.path.join(bundle_cache_path, cache_name), exist_ok=True)
+
         # Create asset that packages the agent code with dependencies
         # Note: Docker must be running during cdk deploy
         agent_asset = s3_assets.Asset(
             self,
             "AgentCodeAsset",
             path=agent_dir_path,
+            # Bytecode from local runs must not change the hash and force a rebundle
+            exclude=["__pycache__", "*.pyc"],
+            # The asset hash only covers agent/, so fold in shared/ as well
+            extra_hash=FileSystem.fingerprint(shared_dir_path, exclude=["__pycache__", "*.pyc"]),
             bundling=BundlingOptions(
                 image=DockerImage.from_registry("python:3.12-slim"),
                 platform="linux/arm64", 
+                volumes=[
+                    DockerVolume(
+                        host_path=os.path.join(bundle_cache_path, "pip"),
+                        container_path="/cache/pip",
+                    ),
+                    DockerVolume(
+                        host_path=os.path.join(bundle_cache_path, "uv"),
+                        container_path="/cache/uv",
+                    ),
+                    DockerVolume(
+                        host_path=shared_dir_path,
+                        container_path="/asset-shared",
+                    ),
+                ],
+                environment={
+                    # Bundling runs as the host user with HOME=/, so point the
+                    # tools at the mounted caches explicitly
+                    "PIP_CACHE_DIR": "/cache/pip",
+                    "UV_CACHE_DIR": "/cache/uv",
+                    # The cache volume and bundle dir are on different filesystems
+                    "UV_LINK_MODE": "copy",
+                },
                 command=[
                     "bash",
                     "-c",
                     f"""
                     set -e
-                    # Install required tools
-                    apt-get update -qq && apt-get install -y -qq curl > /dev/null 2>&1
-
                     # Create bundle directory and copy agent code
                     mkdir -p /tmp/agent-bundle
                     cp -r /asset-input/* /tmp/agent-bundle/ 2>/dev/null || true
+                    cp -r /asset-shared /tmp/agent-bundle/shared
                     cd /tmp/agent-bundle
 
                     # Install dependencies directly with platform targeting
+                    # using uv, which resolves and installs in parallel
                     echo "Installing dependencies for ARM64..."
-                    pip install --target /tmp/agent-bundle --upgrade \
-                        --platform manylinux2014_aarch64 \
-                        --only-binary=:all: \
-                        --python-version 312 \
-                        --implementation cp \
+                    # uv goes into /tmp, as site-packages is not writable by
+                    # the non-root bundling user
+                    pip install --quiet --target /tmp/uv uv
+                    /tmp/uv/bin/uv pip install --target /tmp/agent-bundle \
+                        --python-platform aarch64-manylinux2014 \
+                        --only-binary :all: \
+                        --python-version 3.12 \
                         -r requirements.txt
 
+                    # Precompile to bytecode beside each source file (-b) so the
+                    # runtime imports .pyc directly instead of compiling on cold
+                    # start; create_zip.py then drops every shadowing .py except agent.py.
+                    # Files that fail to compile simply keep their source.
+                    python3 -m compileall -q -j 0 -b /tmp/agent-bundle \
+                        || echo "Some files could not be compiled, keeping their source"
+
                     # Step 3: Create zip file with everything at root level using external script
                     cd /tmp
                     cat > /tmp/create_zip.py << 'PYEOF'
@@ -131,7 +187,7 @@ PYEOF
                     },
                 }
             ),
-            description="Role for Bedrock AgentCore Runtime to access RDS config, and write logs",
+            description="Role for Bedrock AgentCore Runtime to read RDS and OpenAI secrets, and write logs",
         )
 
         # CloudWatch Logs
@@ -195,22 +251,6 @@ PYEOF
             )
         )
 
-        # SSM Parameter Store for DB config under /agentcore/rds/*
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "ssm:GetParameter",
-                    "ssm:GetParameters",
-                ],
-                resources=[
-                    f"arn:aws:ssm:{self.region}:{self.account}:parameter/agentcore/rds/endpoint",
-                    f"arn:aws:ssm:{self.region}:{self.account}:parameter/agentcore/rds/database",
-                    f"arn:aws:ssm:{self.region}:{self.account}:parameter/agentcore/rds/secret-arn",
-                ],
-            )
-        )
-
         # Secrets Manager for DB credentials and OpenAI API key
         runtime_role.add_to_policy(
             iam.PolicyStatement(
@@ -257,6 +297,14 @@ PYEOF
                         "Runtime": "PYTHON_3_12",
                     }
                 },
+                # Deploy-time DB settings so the agent needs no SSM calls at startup
+                "EnvironmentVariables": {
+                    "RDS_ENDPOINT": db_endpoint,
+                    "RDS_DATABASE": db_name,
+                    "RDS_SECRET_ARN": db_secret_arn,
+                    # Build the agent in the background as soon as the container starts
+                    "PRE_WARM": "1",
+                },
             },
         )
 
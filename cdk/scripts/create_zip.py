@@ -8,6 +8,37 @@ import sys
 import tempfile
 from pathlib import Path
 
+# Top-level packages left out of the bundle: the AWS SDK is provided by the
+# AgentCore Python runtime, and the packaging tools are never imported
+EXCLUDED_PACKAGES = {
+    'boto3', 'botocore', 's3transfer', 'jmespath', 'dateutil',
+    'pip', 'setuptools', 'wheel', '_distutils_hack',
+}
+# Distribution names of the packages above, as used in *.dist-info dirs
+EXCLUDED_DISTRIBUTIONS = {
+    'boto3', 'botocore', 's3transfer', 'jmespath', 'python_dateutil',
+    'pip', 'setuptools', 'wheel',
+}
+
+# The runtime entry point is launched by file name, so it ships as source;
+# its .pyc would never be loaded
+ENTRY_POINT = 'agent.py'
+
+# Already-compressed formats gain nothing from deflate, so they are stored
+PRECOMPRESSED_SUFFIXES = {
+    '.zip', '.whl', '.egg', '.jar', '.gz', '.tgz', '.bz2', '.xz', '.zst',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2', '.npz',
+}
+
+def is_excluded_package(name):
+    """Check whether a top-level bundle entry belongs to an excluded package"""
+    if name in EXCLUDED_PACKAGES:
+        return True
+    if name.endswith('.dist-info'):
+        distribution = name[:-len('.dist-info')].split('-')[0]
+        return distribution.lower().replace('.', '_') in EXCLUDED_DISTRIBUTIONS
+    return False
+
 def main():
     # Use environment variables with fallback to system temp directory
     if 'BUNDLE_DIR' in os.environ:
@@ -31,9 +62,15 @@ def main():
     # Filter out __pycache__ directories
     ignore_dirs = {'__pycache__', '.git', '.venv', 'node_modules'}
     
+    # ZIP_COMPRESSION=stored skips compression entirely for the fastest
+    # build, at the cost of a larger upload
+    store_all = os.environ.get('ZIP_COMPRESSION', 'deflated').lower() == 'stored'
+    
     try:
         file_count = 0
-        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # Level 1 is several times faster than the default and compresses
+        # source and shared libraries nearly as well
+        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
             for root, dirs, files in os.walk(bundle_dir):
                 # Filter out ignored directories
                 dirs[:] = [d for d in dirs if d not in ignore_dirs]
@@ -41,12 +78,23 @@ def main():
                 rel_root = os.path.relpath(root, bundle_dir)
                 if rel_root == '.':
                     rel_root = ''
+                    dirs[:] = [d for d in dirs if not is_excluded_package(d)]
                 
                 for file in files:
+                    is_entry_point = not rel_root and file == ENTRY_POINT
+                    if not rel_root and file == ENTRY_POINT + 'c':
+                        continue
+                    # Everything else ships as bytecode when a precompiled .pyc
+                    # sits next to the source, since Python prefers the .py
+                    if not is_entry_point and file.endswith('.py') and file + 'c' in files:
+                        continue
                     file_path = Path(root) / file
                     # Use relative path from bundle_dir as arcname (files at root)
                     file_rel = os.path.join(rel_root, file) if rel_root else file
-                    zipf.write(file_path, file_rel)
+                    if store_all or file_path.suffix.lower() in PRECOMPRESSED_SUFFIXES:
+                        zipf.write(file_path, file_rel, compress_type=zipfile.ZIP_STORED)
+                    else:
+                        zipf.write(file_path, file_rel)
                     file_count += 1
         
         print(f"Created zip with {file_count} files")
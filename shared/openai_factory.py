@@ -0,0 +1,46 @@
+import logging
+import functools
+import threading
+
+from shared.secret_cache import get_secret
+
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+OPENAI_SECRET_NAME = 'openai-api-key'
+
+_model_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=4)
+def _create_openai_model(model_id):
+    # Imported here as it pulls in the OpenAI SDK
+    from strands.models.openai import OpenAIModel
+    
+    # Get OpenAI API key from Secrets Manager
+    secret_data = get_secret(OPENAI_SECRET_NAME)
+    api_key = secret_data.get('openai-api-key', 'Not found')
+    
+    # Create OpenAI model
+    openai_model = OpenAIModel(
+        client_args={"api_key": api_key},
+        model_id=model_id,
+        params={
+            "max_tokens": 2000,
+            "temperature": 0.7,
+            # Routes requests with the same prefix to the same prompt cache
+            "prompt_cache_key": "logistics-agent",
+        }
+    )
+    logger.info(f"OpenAI model {model_id} initialized successfully")
+    return openai_model
+
+def get_openai_model(model_id):
+    """Get the OpenAI model for model_id, built once per container"""
+    # Concurrent first calls must not each build a model
+    with _model_lock:
+        try:
+            return _create_openai_model(model_id)
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI model: {e}", exc_info=True)
+            raise
@@ -0,0 +1,64 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+AWS_REGION = 'us-east-1'
+
+# Decoded secrets are kept in memory and mirrored to /tmp, which survives
+# warm invocations within the same micro-VM
+SECRET_CACHE_TTL_SECONDS = 3600
+SECRET_CACHE_DIR = '/tmp/secret-cache'
+
+_secret_cache = {}
+
+def get_secret(secret_id):
+    """Get a JSON secret from Secrets Manager, cached for SECRET_CACHE_TTL_SECONDS"""
+    now = time.time()
+    
+    cached = _secret_cache.get(secret_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
+    cache_path = os.path.join(SECRET_CACHE_DIR, hashlib.sha256(secret_id.encode()).hexdigest())
+    try:
+        expires_at = os.path.getmtime(cache_path) + SECRET_CACHE_TTL_SECONDS
+        if expires_at > now:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                secret_data = json.load(f)
+            _secret_cache[secret_id] = (secret_data, expires_at)
+            return secret_data
+    except (OSError, ValueError):
+        pass
+    
+    # Deferred so containers that hit the cache never pay the boto3 import
+    import boto3
+    
+    secrets_client = boto3.client('secretsmanager', region_name=AWS_REGION)
+    secret_response = secrets_client.get_secret_value(SecretId=secret_id)
+    secret_data = json.loads(secret_response['SecretString'])
+    _secret_cache[secret_id] = (secret_data, now + SECRET_CACHE_TTL_SECONDS)
+    
+    # Write owner-only and rename into place so readers never see a partial file
+    try:
+        os.makedirs(SECRET_CACHE_DIR, mode=0o700, exist_ok=True)
+        # mkstemp creates a unique 0600 file, so the pre-warm thread and a
+        # request thread in the same process never share a temp path
+        fd, tmp_path = tempfile.mkstemp(dir=SECRET_CACHE_DIR)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(secret_data, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not write secret cache file: {e}")
+    
+    return secret_data